@@ -1,4 +1,5 @@
 import os
+import threading
 import pandas as pd
 import google.generativeai as genai
 from . import database
@@ -10,6 +11,20 @@ if not GEMINI_API_KEY:
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel('gemini-pro')
 
+class PlayersNotFoundError(LookupError):
+    """Raised when some of the players to compare have no data."""
+
+    def __init__(self, player_ids):
+        super().__init__(f"No data found for players with IDs {player_ids}.")
+        self.player_ids = player_ids
+
+class InsightGenerationError(RuntimeError):
+    """Raised when the model fails to generate an insight."""
+
+# Comparison insights for the current data version, keyed by the sorted tuple of player IDs.
+_comparison_cache = {'version': None, 'insights': {}}
+_comparison_cache_lock = threading.Lock()
+
 def get_llm_insight(player_id: int):
     """
     Generates insights from a Large Language Model (LLM) for a given player.
@@ -46,3 +61,64 @@ def get_llm_insight(player_id: int):
         return response.text
     except Exception as e:
         return f"An error occurred while generating the LLM insight: {e}"
+
+def build_comparison_context(comparison_data: pd.DataFrame) -> str:
+    """
+    Formats the comparison data as a compact CSV table so all players share one short context.
+    """
+    return comparison_data.drop(columns=['player_id']).to_csv(index=False, float_format='%.2f')
+
+def get_comparison_insight(player_ids, llm=None):
+    """
+    Generates a single LLM comparison of several players.
+
+    All players are summarised into one combined context and sent in one model call.
+    Results are cached per set of players until the next ingestion changes the data version.
+
+    Args:
+        player_ids: The IDs of the players to compare.
+        llm: The generative model to use. Defaults to the module's Gemini model.
+
+    Returns:
+        A string containing the LLM's comparison.
+
+    Raises:
+        PlayersNotFoundError: If any of the players has no data.
+        InsightGenerationError: If the model call fails.
+    """
+    llm = llm or model
+    key = tuple(sorted(set(player_ids)))
+    version = database.get_data_version()
+
+    with _comparison_cache_lock:
+        if _comparison_cache['version'] != version:
+            _comparison_cache['version'] = version
+            _comparison_cache['insights'] = {}
+        if key in _comparison_cache['insights']:
+            return _comparison_cache['insights'][key]
+
+    comparison_data = database.get_comparison_data(list(key))
+    missing_ids = sorted(set(key) - set(comparison_data['player_id']))
+    if missing_ids:
+        raise PlayersNotFoundError(missing_ids)
+
+    prompt = f"""
+    You are an expert Fantasy Premier League (FPL) analyst.
+    Compare the following players for an FPL manager choosing between them.
+    Weigh their recent form, underlying stats (per 90 where relevant) and price.
+    Conclude with a clear ranking and a one-line reason for each player.
+
+    Player Data (price in millions, form_points averaged over recent gameweeks, stats are season totals):
+    {build_comparison_context(comparison_data)}
+    """
+
+    try:
+        response = llm.generate_content(prompt)
+    except Exception as e:
+        raise InsightGenerationError(f"An error occurred while generating the LLM comparison: {e}") from e
+
+    with _comparison_cache_lock:
+        # Only cache if no ingestion happened while the model was generating.
+        if _comparison_cache['version'] == version:
+            _comparison_cache['insights'][key] = response.text
+    return response.text
@@ -1,9 +1,13 @@
-from flask import Flask, jsonify
-from .database import get_db_connection
-from .analysis import get_llm_insight
+from flask import Flask, jsonify, request
+from .database import get_db_connection, get_player_form, get_player_stat_groups, get_fbref_stat_catalog, nan_to_none
+from .analysis import get_llm_insight, get_comparison_insight, PlayersNotFoundError, InsightGenerationError
+from .similarity import find_similar_players
 
 app = Flask(__name__)
 
+# Upper bound on the number of players in a single comparison, to keep the model context compact.
+MAX_COMPARED_PLAYERS = 5
+
 @app.route('/api/players')
 def get_players():
     conn = get_db_connection()
@@ -18,8 +22,22 @@ def get_players():
         if conn:
             conn.close()
 
+@app.route('/api/stats/groups')
+def get_stat_groups():
+    catalog = get_fbref_stat_catalog()
+    groups = {}
+    for stat_type, stat_group, stat in catalog.itertuples(index=False):
+        groups.setdefault(stat_type, {}).setdefault(stat_group, []).append(stat)
+    return jsonify(groups)
+
 @app.route('/api/stats/<int:player_id>')
 def get_player_stats(player_id):
+    # Requesting specific stat groups (or a non-standard stat type) reads only those stats from the key/value store.
+    if 'groups' in request.args or 'type' in request.args:
+        stat_groups = [group for group in request.args.get('groups', '').split(',') if group]
+        stats = get_player_stat_groups(player_id, stat_groups=stat_groups, stat_type=request.args.get('type', 'standard'))
+        return jsonify(nan_to_none(stats).to_dict(orient='records'))
+
     conn = get_db_connection()
     try:
         with conn:
@@ -32,6 +50,47 @@ def get_player_stats(player_id):
         if conn:
             conn.close()
 
+@app.route('/api/players/<int:player_id>/history')
+def get_player_history(player_id):
+    window = request.args.get('window', default=5, type=int)
+    if window < 1:
+        return jsonify({"error": "window must be a positive integer"}), 400
+
+    history = get_player_form(player_id, window=window)
+    return jsonify(nan_to_none(history).to_dict(orient='records'))
+
+@app.route('/api/players/<int:player_id>/similar')
+def get_similar_players(player_id):
+    k = request.args.get('k', default=5, type=int)
+    position = request.args.get('position')
+    max_price = request.args.get('max_price', type=float)
+    if k < 1:
+        return jsonify({"error": "k must be a positive integer"}), 400
+
+    similar = find_similar_players(player_id, k=k, position=position, max_price=max_price)
+    if similar is None:
+        return jsonify({"error": "No stats available for this player"}), 404
+
+    return jsonify(nan_to_none(similar).to_dict(orient='records'))
+
+@app.route('/api/players/compare')
+def compare_players():
+    try:
+        player_ids = sorted({int(player_id) for player_id in request.args.get('ids', '').split(',') if player_id})
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of player IDs"}), 400
+
+    if not 2 <= len(player_ids) <= MAX_COMPARED_PLAYERS:
+        return jsonify({"error": f"Provide between 2 and {MAX_COMPARED_PLAYERS} distinct player IDs"}), 400
+
+    try:
+        comparison = get_comparison_insight(player_ids)
+    except PlayersNotFoundError as e:
+        return jsonify({"error": str(e), "missing_ids": e.player_ids}), 404
+    except InsightGenerationError as e:
+        return jsonify({"error": str(e)}), 502
+    return jsonify({"player_ids": player_ids, "comparison": comparison})
+
 @app.route('/api/players/<int:player_id>/insight')
 def get_player_insight(player_id):
     conn = get_db_connection()
@@ -1,13 +1,76 @@
 import asyncio
+import json
+import logging
+import os
+import time
 import aiohttp
 from fpl import FPL
+from fpl.constants import API_URLS
+from fpl.utils import fetch
 import soccerdata as sd
 import pandas as pd
 
+# Upper bound on simultaneous element-summary requests sent to the FPL API.
+MAX_CONCURRENT_REQUESTS = 10
+
+# soccerdata stat types ingested from FBref. Each is a separate table on FBref, stored by stat group.
+FBREF_STAT_TYPES = ["standard", "shooting", "passing", "defense", "possession"]
+
+# Root of the live FPL API, as used by the fpl library.
+LIVE_FPL_API_URL = "https://fantasy.premierleague.com/api/"
+
+# When set, payloads are read from this directory of recorded responses instead of the network.
+# The layout mirrors the FPL API paths so the same directory can be served by api/replay_server.py.
+REPLAY_DIR = os.getenv("FPL_REPLAY_DIR")
+
+_fpl_api_url = LIVE_FPL_API_URL
+
+def set_fpl_api_url(base_url: str):
+    """
+    Points the fpl library at a different API root, e.g. a local replay server.
+    """
+    global _fpl_api_url
+    base_url = base_url.rstrip('/') + '/'
+    # The fpl library reads its endpoints from this shared dict, so rewriting it in place redirects every request.
+    for name, url in API_URLS.items():
+        API_URLS[name] = base_url + url[len(_fpl_api_url):]
+    _fpl_api_url = base_url
+
+if os.getenv("FPL_API_URL"):
+    set_fpl_api_url(os.getenv("FPL_API_URL"))
+
+def _read_replay_json(*path_parts):
+    """Reads a recorded FPL API payload from REPLAY_DIR."""
+    with open(os.path.join(REPLAY_DIR, *path_parts), encoding='utf-8') as f:
+        return json.load(f)
+
+def fbref_replay_path(replay_dir: str, season: str, stat_type: str) -> str:
+    """
+    Returns where record_replay_payloads stores the FBref stats of one stat type.
+    Recordings made before other stat types were ingested hold only the standard
+    stats, under a name without the stat type, and are still found for 'standard'.
+    """
+    path = os.path.join(replay_dir, 'fbref', f'player_season_stats_{season}_{stat_type}.pkl')
+    legacy_path = os.path.join(replay_dir, 'fbref', f'player_season_stats_{season}.pkl')
+    if stat_type == "standard" and not os.path.exists(path) and os.path.exists(legacy_path):
+        return legacy_path
+    return path
+
+def load_replay_fbref_stats(replay_dir: str, season: str, stat_type: str = "standard") -> pd.DataFrame:
+    """
+    Loads FBref player season stats recorded by record_replay_payloads.
+    Raises FileNotFoundError if the stat type was not recorded.
+    """
+    return pd.read_pickle(fbref_replay_path(replay_dir, season, stat_type))
+
 def get_fpl_data():
     """
     Fetches all FPL player and team data.
     """
+    if REPLAY_DIR:
+        static = _read_replay_json('bootstrap-static.json')
+        return static['elements'], static['teams']
+
     async def fetch_data():
         async with aiohttp.ClientSession() as session:
             fpl = FPL(session)
@@ -17,10 +80,113 @@ def get_fpl_data():
 
     return asyncio.run(fetch_data())
 
-def get_fbref_stats(season: str) -> pd.DataFrame:
+def get_player_histories(player_ids, latest_gameweeks=None, max_concurrency=MAX_CONCURRENT_REQUESTS, on_request=None):
+    """
+    Fetches per-gameweek history from the FPL element-summary endpoint for the given players.
+
+    Only gameweeks from the player's entry in `latest_gameweeks` (a mapping of
+    player_id -> last stored gameweek) onwards are returned, so repeated runs fetch incrementally.
+    The last stored gameweek itself is fetched again, as it may have been stored while still in
+    progress. At most `max_concurrency` requests are in flight at any one time.
+    Players whose request fails are logged and skipped, so one failure does not lose the rest.
+    If given, `on_request(player_id, seconds, error)` is called after each request, with
+    `error` set to the exception if it failed.
+
+    Returns a list of history dicts, each tagged with its 'player_id'.
+    """
+    latest_gameweeks = latest_gameweeks or {}
+
+    def new_entries(player_id, summary):
+        last_gameweek = latest_gameweeks.get(player_id, 0)
+        return [
+            {**entry, 'player_id': player_id}
+            for entry in summary.get('history', [])
+            if entry['round'] >= last_gameweek
+        ]
+
+    def report(player_id, start, error=None):
+        if on_request:
+            on_request(player_id, time.perf_counter() - start, error)
+
+    if REPLAY_DIR:
+        entries = []
+        for player_id in player_ids:
+            start = time.perf_counter()
+            summary = _read_replay_json('element-summary', f'{player_id}.json')
+            report(player_id, start)
+            entries.extend(new_entries(player_id, summary))
+        return entries
+
+    async def fetch_data():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with aiohttp.ClientSession() as session:
+            fpl = FPL(session)
+
+            async def fetch_player(player_id):
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        summary = await fpl.get_player_summary(player_id, return_json=True)
+                    except Exception as e:
+                        report(player_id, start, e)
+                        raise
+                    report(player_id, start)
+                return new_entries(player_id, summary)
+
+            results = await asyncio.gather(*(fetch_player(player_id) for player_id in player_ids), return_exceptions=True)
+
+        failed_ids = [player_id for player_id, result in zip(player_ids, results) if isinstance(result, Exception)]
+        if failed_ids:
+            logging.warning(f"Could not fetch gameweek history for the following players: {failed_ids}")
+        return [entry for history in results if not isinstance(history, Exception) for entry in history]
+
+    return asyncio.run(fetch_data())
+
+def get_fbref_stats(season: str, stat_type: str = "standard") -> pd.DataFrame:
     """
-    Fetches player season stats from FBref.
+    Fetches player season stats of the given soccerdata stat type from FBref.
+    In replay mode, raises FileNotFoundError if the stat type was not recorded.
     """
+    if REPLAY_DIR:
+        return load_replay_fbref_stats(REPLAY_DIR, season, stat_type)
+
     fbref = sd.FBref(leagues="ENG-Premier League", seasons=season)
-    df = fbref.read_player_season_stats()
+    df = fbref.read_player_season_stats(stat_type=stat_type)
     return df
+
+def record_replay_payloads(replay_dir: str, season: str, player_ids=None, max_concurrency=MAX_CONCURRENT_REQUESTS,
+                           stat_types=FBREF_STAT_TYPES):
+    """
+    Records live FPL and FBref payloads into `replay_dir` for offline replay.
+
+    The FPL responses are stored verbatim under their API paths
+    (bootstrap-static.json, element-summary/<player_id>.json), and the FBref
+    season stats for each of `stat_types` are pickled to preserve their multi-level index.
+    If `player_ids` is not given, every player in bootstrap-static is recorded.
+    """
+    os.makedirs(os.path.join(replay_dir, 'element-summary'), exist_ok=True)
+    os.makedirs(os.path.join(replay_dir, 'fbref'), exist_ok=True)
+
+    def write_json(payload, *path_parts):
+        with open(os.path.join(replay_dir, *path_parts), 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+
+    async def fetch_data():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with aiohttp.ClientSession() as session:
+            static = await fetch(session, API_URLS['static'])
+            write_json(static, 'bootstrap-static.json')
+
+            async def fetch_player(player_id):
+                async with semaphore:
+                    summary = await fetch(session, API_URLS['player'].format(player_id))
+                write_json(summary, 'element-summary', f'{player_id}.json')
+
+            ids = player_ids if player_ids is not None else [player['id'] for player in static['elements']]
+            await asyncio.gather(*(fetch_player(player_id) for player_id in ids))
+
+    asyncio.run(fetch_data())
+
+    fbref = sd.FBref(leagues="ENG-Premier League", seasons=season)
+    for stat_type in stat_types:
+        fbref.read_player_season_stats(stat_type=stat_type).to_pickle(fbref_replay_path(replay_dir, season, stat_type))
@@ -10,57 +10,354 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row
     return conn
 
-def create_database_tables():
-    """Initializes the database and creates tables if they don't exist."""
+def nan_to_none(df: pd.DataFrame) -> pd.DataFrame:
+    """Replaces NaN with None, so missing values are stored as NULL and serialised as JSON null."""
+    return df.astype(object).where(df.notna(), None)
+
+# Rows copied per transaction by batched backfills, so a live database is never locked for long.
+MIGRATION_BATCH_SIZE = 5000
+
+# Columns identifying a row of fbref stats, as opposed to the stats themselves.
+FBREF_KEY_COLUMNS = ['player_id', 'league', 'season', 'team']
+
+# Descriptive fbref columns that are not stats.
+FBREF_METADATA_COLUMNS = ['nation', 'pos', 'age', 'born']
+
+# Stat group of fbref columns that have no group of their own, such as '90s' or 'KP'.
+UNGROUPED_STAT_GROUP = 'Ungrouped'
+
+INSERT_FBREF_STAT_VALUE_SQL = '''
+    INSERT OR REPLACE INTO player_stats_fbref_values (player_id, stat_type, stat_group, stat, league, season, team, value)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+def _is_stat_column(column: str) -> bool:
+    """Every fbref column other than the key and metadata columns is a candidate stat."""
+    return column not in FBREF_KEY_COLUMNS and column not in FBREF_METADATA_COLUMNS
+
+def _split_stat_column(column: str) -> tuple:
+    """
+    Splits a flattened fbref column into (stat_group, stat), e.g. 'Performance_Gls' -> ('Performance', 'Gls').
+    Columns without a group, such as '90s' or 'KP', are put in UNGROUPED_STAT_GROUP.
+    """
+    return tuple(column.split('_', 1)) if '_' in column else (UNGROUPED_STAT_GROUP, column)
+
+def _stat_column_name(stat_group: str, stat: str) -> str:
+    """The inverse of _split_stat_column."""
+    return stat if stat_group == UNGROUPED_STAT_GROUP else f"{stat_group}_{stat}"
+
+def _register_fbref_stats(conn, stat_type: str, stat_columns) -> list:
+    """
+    Adds any stats not seen before to fbref_stat_catalog and, if there were any,
+    regenerates the player_stats_fbref_pivot view so it has a column for each of them.
+
+    Returns:
+        The list of newly registered stat columns.
+    """
+    cursor = conn.execute("SELECT stat_group, stat FROM fbref_stat_catalog WHERE stat_type = ?", (stat_type,))
+    known = {_stat_column_name(stat_group, stat) for stat_group, stat in cursor.fetchall()}
+    new_columns = [col for col in stat_columns if col not in known]
+    if not new_columns:
+        return []
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO fbref_stat_catalog (stat_type, stat_group, stat) VALUES (?, ?, ?)",
+        [(stat_type, *_split_stat_column(col)) for col in new_columns]
+    )
+
+    # The view pivots the key/value store back into one wide row per player, league, season and team.
+    # Stats from types other than 'standard' are prefixed with their type to keep column names unique.
+    cursor = conn.execute("SELECT stat_type, stat_group, stat FROM fbref_stat_catalog ORDER BY rowid")
+    pivot_columns = [
+        f"MAX(CASE WHEN stat_type = {_quote_literal(s_type)} AND stat_group = {_quote_literal(group)}"
+        f" AND stat = {_quote_literal(stat)} THEN value END)"
+        f" AS {_quote_identifier(_stat_column_name(group, stat) if s_type == 'standard' else f'{s_type}_{_stat_column_name(group, stat)}')}"
+        for s_type, group, stat in cursor.fetchall()
+    ]
+    conn.execute("DROP VIEW IF EXISTS player_stats_fbref_pivot")
+    conn.execute(f'''
+        CREATE VIEW player_stats_fbref_pivot AS
+        SELECT player_id, league, season, team, {', '.join(pivot_columns)}
+        FROM player_stats_fbref_values
+        GROUP BY player_id, league, season, team
+    ''')
+    return new_columns
+
+def _migration_001_initial_schema(conn):
+    """Creates the original teams, players and player_stats_fbref tables."""
+    cursor = conn.cursor()
+
+    # Create teams table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS teams (
+            team_id INTEGER PRIMARY KEY,
+            team_name TEXT UNIQUE NOT NULL,
+            fpl_team_code INTEGER
+        )
+    ''')
+
+    # Create players table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS players (
+            player_id INTEGER PRIMARY KEY,
+            full_name TEXT NOT NULL,
+            position TEXT NOT NULL,
+            team_id INTEGER,
+            FOREIGN KEY (team_id) REFERENCES teams (team_id)
+        )
+    ''')
+
+    # Create player_stats_fbref table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_stats_fbref (
+            player_id INTEGER,
+            league TEXT, season TEXT, team TEXT, nation TEXT, pos TEXT, age REAL, born REAL,
+            "Playing Time_MP" REAL, "Playing Time_Starts" REAL, "Playing Time_Min" REAL, "Playing Time_90s" REAL,
+            "Performance_Gls" REAL, "Performance_Ast" REAL, "Performance_G+A" REAL, "Performance_G-PK" REAL,
+            "Performance_PK" REAL, "Performance_PKatt" REAL, "Performance_CrdY" REAL, "Performance_CrdR" REAL,
+            "Expected_xG" REAL, "Expected_npxG" REAL, "Expected_xAG" REAL, "Expected_npxG+xAG" REAL,
+            "Progression_PrgC" REAL, "Progression_PrgP" REAL, "Progression_PrgR" REAL,
+            "Per 90 Minutes_Gls" REAL, "Per 90 Minutes_Ast" REAL, "Per 90 Minutes_G+A" REAL,
+            "Per 90 Minutes_G-PK" REAL, "Per 90 Minutes_G+A-PK" REAL, "Per 90 Minutes_xG" REAL,
+            "Per 90 Minutes_xAG" REAL, "Per 90 Minutes_xG+xAG" REAL, "Per 90 Minutes_npxG" REAL,
+            "Per 90 Minutes_npxG+xAG" REAL,
+            PRIMARY KEY (player_id, league, season, team),
+            FOREIGN KEY (player_id) REFERENCES players (player_id)
+        )
+    ''')
+
+def _migration_002_gameweek_history(conn):
+    """Creates the append-only player_gameweek_history table, one row per player per gameweek."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS player_gameweek_history (
+            player_id INTEGER NOT NULL,
+            gameweek INTEGER NOT NULL,
+            fixtures INTEGER, minutes INTEGER, total_points INTEGER,
+            goals_scored INTEGER, assists INTEGER, clean_sheets INTEGER, goals_conceded INTEGER,
+            bonus INTEGER, bps INTEGER,
+            expected_goals REAL, expected_assists REAL, expected_goal_involvements REAL,
+            value INTEGER, selected INTEGER,
+            PRIMARY KEY (player_id, gameweek),
+            FOREIGN KEY (player_id) REFERENCES players (player_id)
+        )
+    ''')
+
+def _migration_003_data_version(conn):
+    """Creates the data_version table, a single counter bumped by every ingestion so caches can detect new data."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+def _migration_004_lookup_indexes(conn):
+    """Indexes the player name and season lookups used by ingestion and the read endpoints."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_players_full_name ON players (full_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_player_stats_fbref_season ON player_stats_fbref (season, player_id)")
+
+def _migration_005_fbref_stat_store(conn):
+    """
+    Creates the key/value fbref stat store and its catalog, then backfills them in batches
+    from the existing player_stats_fbref rows.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS player_stats_fbref_values (
+            player_id INTEGER NOT NULL,
+            stat_type TEXT NOT NULL,
+            stat_group TEXT NOT NULL,
+            stat TEXT NOT NULL,
+            league TEXT NOT NULL, season TEXT NOT NULL, team TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (player_id, stat_type, stat_group, stat, league, season, team),
+            FOREIGN KEY (player_id) REFERENCES players (player_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fbref_stat_catalog (
+            stat_type TEXT NOT NULL,
+            stat_group TEXT NOT NULL,
+            stat TEXT NOT NULL,
+            first_seen TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (stat_type, stat_group, stat)
+        )
+    ''')
+
+    cursor = conn.execute("PRAGMA table_info(player_stats_fbref)")
+    stat_columns = [info[1] for info in cursor.fetchall() if _is_stat_column(info[1])]
+    _register_fbref_stats(conn, 'standard', stat_columns)
+
+    def to_stat_values(rows):
+        return [
+            (row[1], 'standard', *_split_stat_column(column), row[2], row[3], row[4], value)
+            for row in rows
+            for column, value in zip(stat_columns, row[5:])
+            if value is not None
+        ]
+
+    backfill_in_batches(
+        conn,
+        f"""
+            SELECT rowid, player_id, league, season, team, {', '.join(_quote_identifier(col) for col in stat_columns)}
+            FROM player_stats_fbref WHERE rowid > ? ORDER BY rowid LIMIT ?
+        """,
+        INSERT_FBREF_STAT_VALUE_SQL,
+        transform=to_stat_values
+    )
+
+# Ordered schema migrations as (version, description, function, batched). Append new migrations to the end;
+# never edit or reorder one that has been released, as existing databases have already applied it.
+# A migration runs in a single transaction unless it is batched, in which case it backfills existing
+# data with backfill_in_batches and commits batch by batch.
+MIGRATIONS = [
+    (1, "Initial schema", _migration_001_initial_schema, False),
+    (2, "Player gameweek history", _migration_002_gameweek_history, False),
+    (3, "Data version counter", _migration_003_data_version, False),
+    (4, "Lookup indexes", _migration_004_lookup_indexes, False),
+    (5, "Key/value fbref stat store", _migration_005_fbref_stat_store, True),
+]
+
+def get_schema_version() -> int:
+    """Returns the latest migration version applied to the database, or 0 for a new database."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+        if cursor.fetchone() is None:
+            return 0
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        return cursor.fetchone()[0] or 0
 
-        # Create teams table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS teams (
-                team_id INTEGER PRIMARY KEY,
-                team_name TEXT UNIQUE NOT NULL,
-                fpl_team_code INTEGER
-            )
-        ''')
+def migrate_database(target_version: int = None):
+    """
+    Upgrades the database schema in place by applying any pending migrations in order.
 
-        # Create players table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                player_id INTEGER PRIMARY KEY,
-                full_name TEXT NOT NULL,
-                position TEXT NOT NULL,
-                team_id INTEGER,
-                FOREIGN KEY (team_id) REFERENCES teams (team_id)
-            )
-        ''')
+    Each migration runs in its own transaction, taken with BEGIN IMMEDIATE so that concurrent
+    upgrades (e.g. main.py and migrate.py) apply it only once, and is recorded in the
+    schema_version table in that same transaction. A failed migration is rolled back entirely,
+    so the upgrade can simply be re-run. Batched migrations commit as they go instead, so the
+    write lock is only held while checking that they have not been applied yet: two upgrades
+    starting at the same time may both run one, and they must be safe to re-run. The database is switched to WAL journaling so the API can keep serving
+    reads while a migration is running.
 
-        # Create player_stats_fbref table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS player_stats_fbref (
-                player_id INTEGER,
-                league TEXT, season TEXT, team TEXT, nation TEXT, pos TEXT, age REAL, born REAL,
-                "Playing Time_MP" REAL, "Playing Time_Starts" REAL, "Playing Time_Min" REAL, "Playing Time_90s" REAL,
-                "Performance_Gls" REAL, "Performance_Ast" REAL, "Performance_G+A" REAL, "Performance_G-PK" REAL,
-                "Performance_PK" REAL, "Performance_PKatt" REAL, "Performance_CrdY" REAL, "Performance_CrdR" REAL,
-                "Expected_xG" REAL, "Expected_npxG" REAL, "Expected_xAG" REAL, "Expected_npxG+xAG" REAL,
-                "Progression_PrgC" REAL, "Progression_PrgP" REAL, "Progression_PrgR" REAL,
-                "Per 90 Minutes_Gls" REAL, "Per 90 Minutes_Ast" REAL, "Per 90 Minutes_G+A" REAL,
-                "Per 90 Minutes_G-PK" REAL, "Per 90 Minutes_G+A-PK" REAL, "Per 90 Minutes_xG" REAL,
-                "Per 90 Minutes_xAG" REAL, "Per 90 Minutes_xG+xAG" REAL, "Per 90 Minutes_npxG" REAL,
-                "Per 90 Minutes_npxG+xAG" REAL,
-                PRIMARY KEY (player_id, league, season, team),
-                FOREIGN KEY (player_id) REFERENCES players (player_id)
+    Args:
+        target_version: Stop after this migration version. Defaults to the latest.
+    """
+    with get_db_connection() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        conn.commit()
+
+    current_version = get_schema_version()
+    for version, description, migration, batched in MIGRATIONS:
+        if version <= current_version or (target_version is not None and version > target_version):
+            continue
 
+        logging.info(f"Applying schema migration {version}: {description}")
+        conn = get_db_connection()
+        try:
+            if batched:
+                # Skip it if another process finished it since we read the schema version; holding
+                # the write lock for the whole backfill would block ingestion for its duration.
+                conn.execute("BEGIN IMMEDIATE")
+                applied = conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone()
+                conn.commit()
+                if applied:
+                    continue
+                migration(conn)
+                conn.execute(
+                    "INSERT OR IGNORE INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+                conn.commit()
+            else:
+                # Python's sqlite3 does not open a transaction for DDL by default, so manage it explicitly.
+                conn.isolation_level = None
+                conn.execute("BEGIN IMMEDIATE")
+                # Another process may have applied this migration while we waited for the write lock.
+                if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone() is None:
+                    migration(conn)
+                    conn.execute(
+                        "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                        (version, description)
+                    )
+                conn.execute("COMMIT")
+        except Exception as e:
+            logging.error(f"Schema migration {version} failed: {e}")
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+def backfill_in_batches(conn, select_sql: str, write_sql: str, transform=None, batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """
+    Copies or rewrites rows in small transactions, for migrations that backfill existing data.
+
+    `select_sql` must take the last seen rowid and a batch size as parameters and return the
+    rowid as its first column, e.g. "SELECT rowid, a FROM t WHERE rowid > ? ORDER BY rowid LIMIT ?".
+    Each batch (optionally mapped through `transform`, which receives the selected rows and
+    returns the parameter rows) is written with `write_sql` and committed before the next one
+    is read, so readers and ingestion are only ever blocked for a single batch. Backfills must
+    be idempotent, as a batch may be repeated if the migration is interrupted.
+
+    Returns:
+        The number of rows selected.
+    """
+    last_rowid = 0
+    total = 0
+    while True:
+        rows = conn.execute(select_sql, (last_rowid, batch_size)).fetchall()
+        if not rows:
+            return total
+        last_rowid = rows[-1][0]
+        total += len(rows)
+        conn.executemany(write_sql, transform(rows) if transform else [tuple(row) for row in rows])
         conn.commit()
 
-def populate_fbref_stats(stats_dataframe: pd.DataFrame):
+def create_database_tables():
+    """Initializes the database and upgrades its schema to the latest version."""
+    migrate_database()
+
+def bump_data_version(conn):
+    """Marks the data as changed. Call inside the ingestion transaction so the bump commits with the data."""
+    conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+def get_data_version() -> int:
+    """
+    Returns the current data version. It changes whenever an ingestion writes new data,
+    including ingestions run from another process such as main.py.
     """
-    Populates the player_stats_fbref table from a DataFrame.
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+def populate_fbref_stats(stats_dataframe: pd.DataFrame, stat_type: str = 'standard'):
+    """
+    Populates the fbref stat tables from a DataFrame.
     This function maps player names to IDs, unnests the multi-level column index,
     and inserts the data into the database.
+
+    Every numeric column other than the key and metadata columns is stored in the
+    player_stats_fbref_values key/value store, so stats not known in advance are kept
+    rather than dropped (ungrouped ones such as '90s' in UNGROUPED_STAT_GROUP);
+    newly seen stats are registered in fbref_stat_catalog. For the 'standard' stat type
+    the columns that exist in the wide player_stats_fbref table are written there as well.
+
+    Args:
+        stats_dataframe: A DataFrame from soccerdata's read_player_season_stats.
+        stat_type: The soccerdata stat type the DataFrame was read with (e.g. 'shooting').
     """
     with get_db_connection() as conn:
         # Step 1: Create a mapping from full_name to player_id from the players table.
@@ -84,35 +381,65 @@ def populate_fbref_stats(stats_dataframe: pd.DataFrame):
     stats_dataframe.dropna(subset=['player_id'], inplace=True)
     stats_dataframe['player_id'] = stats_dataframe['player_id'].astype(int)
 
-    # Step 4: Filter DataFrame to only include columns that exist in the database table.
+    # We no longer need the 'player' name column for insertion, nor the 'index' column that
+    # reset_index adds for an unnamed index.
+    stats_dataframe.drop(columns=[col for col in ('player', 'index') if col in stats_dataframe.columns], inplace=True)
+
+    # Step 4: Unpivot every numeric stat column into (stat_group, stat, value) rows for the key/value store.
+    candidate_columns = [col for col in stats_dataframe.columns if _is_stat_column(col)]
+    numeric_stats = stats_dataframe[candidate_columns].apply(pd.to_numeric, errors='coerce')
+    skipped_columns = [
+        col for col in candidate_columns
+        if numeric_stats[col].isna().all() and stats_dataframe[col].notna().any()
+    ]
+    if skipped_columns:
+        logging.warning(f"Skipping non-numeric fbref '{stat_type}' columns: {skipped_columns}")
+    stat_columns = [col for col in candidate_columns if col not in skipped_columns]
+
+    values_df = stats_dataframe[FBREF_KEY_COLUMNS].join(numeric_stats[stat_columns]).melt(
+        id_vars=FBREF_KEY_COLUMNS, var_name='column', value_name='value'
+    ).dropna(subset=['value'])
+    split_columns = {col: _split_stat_column(col) for col in stat_columns}
+    values_df['stat_group'] = values_df['column'].map(lambda col: split_columns[col][0])
+    values_df['stat'] = values_df['column'].map(lambda col: split_columns[col][1])
+    values_df['stat_type'] = stat_type
+    stat_values = values_df[
+        ['player_id', 'stat_type', 'stat_group', 'stat', 'league', 'season', 'team', 'value']
+    ].astype(object).itertuples(index=False, name=None)
+
+    # Step 5: Filter DataFrame to only include columns that exist in the wide table.
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("PRAGMA table_info(player_stats_fbref)")
         table_columns = {info[1] for info in cursor.fetchall()}
 
-    # We no longer need the 'player' name column for insertion.
-    if 'player' in stats_dataframe.columns:
-        stats_dataframe.drop(columns=['player'], inplace=True)
-
     df_filtered = stats_dataframe[[col for col in stats_dataframe.columns if col in table_columns]]
 
-    # Step 5: Insert data into the database.
+    # Step 6: Insert data into the database.
     with get_db_connection() as conn:
         try:
-            # Use a custom method for 'INSERT OR REPLACE' functionality with pandas `to_sql`.
-            # The PRIMARY KEY on (player_id, league, season, team) ensures uniqueness.
-            def insert_or_replace(table, connection, keys, data_iter):
-                sql = f'INSERT OR REPLACE INTO "{table.name}" ({",".join(f"`{k}`" for k in keys)}) VALUES ({",".join(["?"] * len(keys))})'
-                connection.executemany(sql, data_iter)
-
-            df_filtered.to_sql(
-                'player_stats_fbref',
-                conn,
-                if_exists='append',
-                index=False,
-                chunksize=1000,
-                method=insert_or_replace
-            )
+            new_columns = _register_fbref_stats(conn, stat_type, stat_columns)
+            if new_columns:
+                logging.info(f"Detected new fbref '{stat_type}' stats: {new_columns}")
+            conn.executemany(INSERT_FBREF_STAT_VALUE_SQL, stat_values)
+
+            # Only the standard stat type maps onto the wide table; other types would overwrite it with NULLs.
+            if stat_type == 'standard':
+                # Use a custom method for 'INSERT OR REPLACE' functionality with pandas `to_sql`.
+                # The PRIMARY KEY on (player_id, league, season, team) ensures uniqueness.
+                def insert_or_replace(table, connection, keys, data_iter):
+                    sql = f'INSERT OR REPLACE INTO "{table.name}" ({",".join(f"`{k}`" for k in keys)}) VALUES ({",".join(["?"] * len(keys))})'
+                    connection.executemany(sql, data_iter)
+
+                df_filtered.to_sql(
+                    'player_stats_fbref',
+                    conn,
+                    if_exists='append',
+                    index=False,
+                    chunksize=1000,
+                    method=insert_or_replace
+                )
+            bump_data_version(conn)
             conn.commit()
         except Exception as e:
             logging.error(f"An error occurred during database population: {e}")
@@ -160,8 +487,185 @@ def populate_teams_and_players(players_data, teams_data):
             players_to_insert
         )
 
+        bump_data_version(conn)
         conn.commit()
 
+def get_latest_gameweeks() -> dict:
+    """
+    Returns a mapping of player_id to the most recent gameweek stored in player_gameweek_history.
+    Used to fetch only that gameweek and newer ones on subsequent ingestion runs.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT player_id, MAX(gameweek) FROM player_gameweek_history GROUP BY player_id")
+        return {player_id: gameweek for player_id, gameweek in cursor.fetchall()}
+
+def populate_gameweek_history(history_data):
+    """
+    Appends per-gameweek player history from the FPL element-summary data.
+
+    Double gameweeks appear as several entries with the same 'round'; these are
+    combined into a single row so the table stays keyed by (player_id, gameweek).
+    A gameweek that is already stored is replaced, so one stored while still in
+    progress is corrected when get_player_histories fetches it again.
+    """
+    if not history_data:
+        return
+
+    history_df = pd.DataFrame(history_data).rename(columns={'round': 'gameweek'})
+    history_df['fixtures'] = 1
+
+    # The FPL API serialises expected stats as strings (e.g. "0.35").
+    expected_columns = ['expected_goals', 'expected_assists', 'expected_goal_involvements']
+    for col in expected_columns:
+        if col not in history_df.columns:
+            history_df[col] = None
+        history_df[col] = pd.to_numeric(history_df[col], errors='coerce')
+
+    summed_columns = [
+        'fixtures', 'minutes', 'total_points', 'goals_scored', 'assists', 'clean_sheets',
+        'goals_conceded', 'bonus', 'bps', *expected_columns,
+    ]
+    summed_columns = [col for col in summed_columns if col in history_df.columns]
+    # Price and ownership are snapshots, so keep the value from the last fixture of the gameweek.
+    last_columns = [col for col in ('value', 'selected') if col in history_df.columns]
+
+    # The API lists history chronologically, so a stable sort preserves fixture order within a gameweek.
+    history_df = history_df.sort_values(['player_id', 'gameweek'], kind='stable')
+    grouped = history_df.groupby(['player_id', 'gameweek'])
+    # min_count=1 keeps a gameweek with no values for a stat as NULL rather than 0.
+    history_df = pd.concat(
+        [grouped[summed_columns].sum(min_count=1), grouped[last_columns].last()], axis=1
+    ).reset_index()
+
+    columns = history_df.columns.tolist()
+    rows = nan_to_none(history_df).itertuples(index=False, name=None)
+
+    with get_db_connection() as conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO player_gameweek_history ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})",
+            rows
+        )
+        bump_data_version(conn)
+        conn.commit()
+
+def get_player_form(player_id: int, window: int = 5) -> pd.DataFrame:
+    """
+    Retrieves a player's gameweek history with rolling form metrics over the last `window` gameweeks.
+
+    Args:
+        player_id: The ID of the player to retrieve history for.
+        window: The number of gameweeks in the rolling window.
+
+    Returns:
+        A pandas DataFrame with one row per gameweek, ordered by gameweek.
+    """
+    with get_db_connection() as conn:
+        # The rolling metrics are computed by SQLite window functions over the gameweek ordering.
+        query = """
+            SELECT *,
+                AVG(total_points) OVER w AS form_points,
+                AVG(minutes) OVER w AS form_minutes,
+                SUM(expected_goal_involvements) OVER w AS form_xgi
+            FROM player_gameweek_history
+            WHERE player_id = ?
+            WINDOW w AS (ORDER BY gameweek ROWS BETWEEN ? PRECEDING AND CURRENT ROW)
+            ORDER BY gameweek
+        """
+        df = pd.read_sql_query(query, conn, params=(player_id, window - 1))
+    return df
+
+def get_comparison_data(player_ids, form_window: int = 5) -> pd.DataFrame:
+    """
+    Retrieves a compact summary of several players for side-by-side comparison.
+
+    Each row holds the player's team and position, latest price, average points over the
+    last `form_window` gameweeks and fbref totals for the latest season.
+
+    Args:
+        player_ids: The IDs of the players to compare.
+        form_window: The number of recent gameweeks used for the form average.
+
+    Returns:
+        A pandas DataFrame with one row per player found, ordered by player_id.
+    """
+    placeholders = ', '.join(['?'] * len(player_ids))
+    query = f"""
+        WITH recent AS (
+            SELECT player_id, gameweek, total_points, value,
+                ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY gameweek DESC) AS rn
+            FROM player_gameweek_history
+            WHERE player_id IN ({placeholders})
+        ),
+        season_stats AS (
+            SELECT player_id,
+                SUM("Playing Time_90s") AS nineties, SUM("Performance_Gls") AS goals,
+                SUM("Performance_Ast") AS assists, SUM("Expected_xG") AS xg, SUM("Expected_xAG") AS xag
+            FROM player_stats_fbref
+            WHERE player_id IN ({placeholders}) AND season = (SELECT MAX(season) FROM player_stats_fbref)
+            GROUP BY player_id
+        )
+        SELECT p.player_id, p.full_name, p.position, t.team_name,
+            MAX(CASE WHEN r.rn = 1 THEN r.value END) / 10.0 AS price,
+            ROUND(AVG(r.total_points), 2) AS form_points,
+            s.nineties, s.goals, s.assists, s.xg, s.xag
+        FROM players p
+        LEFT JOIN teams t ON t.team_id = p.team_id
+        LEFT JOIN recent r ON r.player_id = p.player_id AND r.rn <= ?
+        LEFT JOIN season_stats s ON s.player_id = p.player_id
+        WHERE p.player_id IN ({placeholders})
+        GROUP BY p.player_id
+        ORDER BY p.player_id
+    """
+    params = (*player_ids, *player_ids, form_window, *player_ids)
+    with get_db_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    return df
+
+def get_fbref_stat_catalog() -> pd.DataFrame:
+    """
+    Returns every fbref stat seen so far, as (stat_type, stat_group, stat) rows in first-seen order.
+    """
+    with get_db_connection() as conn:
+        df = pd.read_sql_query(
+            "SELECT stat_type, stat_group, stat FROM fbref_stat_catalog ORDER BY rowid", conn
+        )
+    return df
+
+def get_player_stat_groups(player_id: int, stat_groups=None, stat_type: str = 'standard') -> pd.DataFrame:
+    """
+    Retrieves a player's fbref stats for the requested stat groups only.
+
+    Args:
+        player_id: The ID of the player to retrieve stats for.
+        stat_groups: The stat groups to include (e.g. ['Performance', 'Expected', UNGROUPED_STAT_GROUP]).
+            Defaults to all groups.
+        stat_type: The soccerdata stat type the groups belong to.
+
+    Returns:
+        A pandas DataFrame with one row per league, season and team and a
+        '<stat group>_<stat>' column (just '<stat>' for ungrouped stats) for each stat in the requested groups.
+    """
+    # The store's primary key starts with (player_id, stat_type, stat_group), so only the
+    # requested groups are read rather than every stat the player has.
+    query = """
+        SELECT league, season, team, stat_group, stat, value
+        FROM player_stats_fbref_values
+        WHERE player_id = ? AND stat_type = ?
+    """
+    params = [player_id, stat_type]
+    if stat_groups:
+        query += f" AND stat_group IN ({', '.join(['?'] * len(stat_groups))})"
+        params.extend(stat_groups)
+
+    with get_db_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+
+    df['column'] = df['stat'].where(df['stat_group'] == UNGROUPED_STAT_GROUP, df['stat_group'] + '_' + df['stat'])
+    wide = df.pivot_table(index=['league', 'season', 'team'], columns='column', values='value', aggfunc='first', sort=False)
+    wide.columns.name = None
+    return wide.reset_index()
+
 def get_player_data(player_id: int) -> pd.DataFrame:
     """
     Retrieves all data for a specific player from the database.
@@ -0,0 +1,196 @@
+import argparse
+import itertools
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from werkzeug.serving import make_server
+
+from . import data_fetcher, database
+from .replay_server import start_server
+
+def summarise(name: str, latencies, errors: int, elapsed: float) -> dict:
+    """
+    Summarises a batch of timed operations as throughput and latency percentiles (in milliseconds).
+    """
+    latencies_ms = pd.Series(latencies, dtype=float) * 1000
+    return {
+        'name': name,
+        'count': len(latencies),
+        'errors': errors,
+        'throughput_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': latencies_ms.quantile(0.50),
+        'p90_ms': latencies_ms.quantile(0.90),
+        'p99_ms': latencies_ms.quantile(0.99),
+        'max_ms': latencies_ms.max(),
+    }
+
+def run_ingestion(replay_dir: str, season: str, concurrency: int, mode: str, latency_ms: float):
+    """
+    Runs the full ingestion pipeline against recorded payloads and times each stage.
+    Returns the elapsed time of each stage, a summary of the individual element-summary
+    requests and the ingested player IDs.
+
+    In 'server' mode FPL requests go over HTTP to a local replay server; in 'files'
+    mode data_fetcher reads the recorded payloads directly from disk.
+    """
+    server = None
+    if mode == 'server':
+        server = start_server(replay_dir, latency_ms=latency_ms)
+        data_fetcher.REPLAY_DIR = None
+        data_fetcher.set_fpl_api_url(f"http://127.0.0.1:{server.server_port}/api/")
+    else:
+        data_fetcher.REPLAY_DIR = replay_dir
+
+    def timed(name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        stages.append({'name': name, 'elapsed_s': time.perf_counter() - start})
+        return result
+
+    def record_request(player_id, seconds, error):
+        request_latencies.append(seconds)
+        request_errors.append(error)
+
+    stages = []
+    request_latencies = []
+    request_errors = []
+    try:
+        timed('create_tables', database.create_database_tables)
+        players_data, teams_data = timed('fetch_fpl', data_fetcher.get_fpl_data)
+        timed('populate_players', database.populate_teams_and_players, players_data, teams_data)
+
+        player_ids = [player['id'] for player in players_data]
+        history_data = timed(
+            'fetch_histories', data_fetcher.get_player_histories,
+            player_ids, latest_gameweeks=database.get_latest_gameweeks(), max_concurrency=concurrency,
+            on_request=record_request
+        )
+        timed('populate_histories', database.populate_gameweek_history, history_data)
+
+        for stat_type in data_fetcher.FBREF_STAT_TYPES:
+            stats_path = data_fetcher.fbref_replay_path(replay_dir, season, stat_type)
+            if not os.path.exists(stats_path):
+                logging.warning(f"No recorded FBref '{stat_type}' stats at {stats_path}, skipping them.")
+                continue
+            stats_df = timed(f'load_fbref_{stat_type}', data_fetcher.load_replay_fbref_stats, replay_dir, season, stat_type)
+            timed(f'populate_fbref_{stat_type}', database.populate_fbref_stats, stats_df, stat_type=stat_type)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+            data_fetcher.set_fpl_api_url(data_fetcher.LIVE_FPL_API_URL)
+
+    fetch_elapsed = next(stage['elapsed_s'] for stage in stages if stage['name'] == 'fetch_histories')
+    request_summary = summarise(
+        'element-summary', request_latencies, sum(error is not None for error in request_errors), fetch_elapsed
+    )
+    return stages, request_summary, player_ids
+
+def run_api_load(api_url: str, player_ids, total_requests: int, concurrency: int) -> list:
+    """
+    Issues `total_requests` GET requests across the read endpoints with `concurrency` workers.
+    """
+    endpoints = {
+        'players': lambda player_id: '/api/players',
+        'stats': lambda player_id: f'/api/stats/{player_id}',
+        'history': lambda player_id: f'/api/players/{player_id}/history',
+    }
+    schedule = list(itertools.islice(itertools.cycle(endpoints), total_requests))
+    latencies = {name: [] for name in endpoints}
+    errors = {name: 0 for name in endpoints}
+    elapsed_by_endpoint = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def issue(name):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        url = api_url.rstrip('/') + endpoints[name](random.choice(player_ids))
+        start = time.perf_counter()
+        try:
+            ok = local.session.get(url, timeout=30).ok
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[name].append(elapsed)
+            errors[name] += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for name in endpoints:
+            # Give each endpoint its own wall-clock window so throughput is per endpoint.
+            endpoint_start = time.perf_counter()
+            list(executor.map(issue, [n for n in schedule if n == name]))
+            elapsed_by_endpoint[name] = time.perf_counter() - endpoint_start
+    total_elapsed = time.perf_counter() - start
+
+    results = [
+        summarise(f'GET {name}', latencies[name], errors[name], elapsed_by_endpoint[name])
+        for name in endpoints
+    ]
+    all_latencies = [latency for name in endpoints for latency in latencies[name]]
+    results.append(summarise('GET all', all_latencies, sum(errors.values()), total_elapsed))
+    return results
+
+def main():
+    """
+    Load-tests ingestion and the read API endpoints using recorded FPL/FBref payloads.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--replay-dir', required=True, help="Directory written by data_fetcher.record_replay_payloads.")
+    parser.add_argument('--season', default="2024-2025")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent element-summary fetches and API clients.")
+    parser.add_argument('--requests', type=int, default=300, help="Total number of API requests to issue.")
+    parser.add_argument('--mode', choices=['server', 'files'], default='server', help="Replay FPL data over HTTP or straight from disk.")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Artificial delay added by the replay server.")
+    parser.add_argument('--api-url', help="Base URL of a running API to target. Defaults to an in-process server.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Per-request access logs from the in-process API server would drown out the report.
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Ingest into a throwaway database so the load test never touches fpl.db.
+        database.DATABASE_FILE = os.path.join(tmp_dir, 'load_test.db')
+
+        logging.info(f"Running ingestion in {args.mode} mode with concurrency {args.concurrency}...")
+        stages, request_summary, player_ids = run_ingestion(
+            args.replay_dir, args.season, args.concurrency, args.mode, args.latency_ms
+        )
+
+        api_server = None
+        api_url = args.api_url
+        if not api_url:
+            # analysis.py needs a Gemini key at import, but none of the load-tested endpoints call the model.
+            os.environ.setdefault('GEMINI_API_KEY', 'load-test')
+            from .app import app
+            api_server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=api_server.serve_forever, daemon=True).start()
+            api_url = f"http://127.0.0.1:{api_server.server_port}"
+
+        try:
+            logging.info(f"Issuing {args.requests} API requests against {api_url} with concurrency {args.concurrency}...")
+            api_results = run_api_load(api_url, player_ids, args.requests, args.concurrency)
+        finally:
+            if api_server:
+                api_server.shutdown()
+
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 200):
+        print("\nIngestion stages")
+        print(pd.DataFrame(stages).set_index('name').to_string())
+        print("\nFPL requests")
+        print(pd.DataFrame([request_summary]).set_index('name').to_string())
+        print("\nAPI")
+        print(pd.DataFrame(api_results).set_index('name').to_string())
+
+if __name__ == "__main__":
+    main()
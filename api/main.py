@@ -1,6 +1,9 @@
 import logging
-from database import create_database_tables, populate_teams_and_players, populate_fbref_stats
-from data_fetcher import get_fpl_data, get_fbref_stats
+from database import (
+    create_database_tables, populate_teams_and_players, populate_fbref_stats,
+    get_latest_gameweeks, populate_gameweek_history,
+)
+from data_fetcher import get_fpl_data, get_fbref_stats, get_player_histories, FBREF_STAT_TYPES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,16 +23,29 @@ def main():
 
         season = "2024-2025"  # This could be parameterized or moved to a config file.
         logging.info(f"Fetching FBref stats data for the {season} season...")
-        stats_df = get_fbref_stats(season=season)
+        stats_dfs = {}
+        for stat_type in FBREF_STAT_TYPES:
+            try:
+                stats_dfs[stat_type] = get_fbref_stats(season=season, stat_type=stat_type)
+            except FileNotFoundError as e:
+                # A replay recording may not include every stat type.
+                logging.warning(f"No recorded FBref '{stat_type}' stats, skipping them: {e}")
 
         logging.info("Populating the database with FPL teams and players data...")
         populate_teams_and_players(players_data, teams_data)
         logging.info("Database populated with FPL data successfully.")
 
         logging.info("Populating the database with FBref stats data...")
-        populate_fbref_stats(stats_df)
+        for stat_type, stats_df in stats_dfs.items():
+            populate_fbref_stats(stats_df, stat_type=stat_type)
         logging.info("Database populated with FBref stats successfully.")
 
+        logging.info("Fetching new gameweek history for FPL players...")
+        player_ids = [player['id'] for player in players_data]
+        history_data = get_player_histories(player_ids, latest_gameweeks=get_latest_gameweeks())
+        populate_gameweek_history(history_data)
+        logging.info(f"Stored {len(history_data)} new gameweek history entries.")
+
     except (ConnectionError, KeyError) as e:
         logging.error(f"A specific error occurred in the main process: {e}", exc_info=True)
     except Exception as e:
@@ -0,0 +1,23 @@
+import logging
+import sys
+from database import migrate_database, get_schema_version, MIGRATIONS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def main():
+    """
+    Upgrades the schema of an existing database in place, without re-ingesting any data.
+    The API can keep running while this script applies migrations.
+    """
+    try:
+        latest_version = MIGRATIONS[-1][0]
+        logging.info(f"Database schema is at version {get_schema_version()}; latest is {latest_version}.")
+        migrate_database()
+        logging.info(f"Database schema is now at version {get_schema_version()}.")
+    except Exception as e:
+        logging.error(f"An error occurred while migrating the database: {e}", exc_info=True)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+def make_handler(replay_dir: str, latency_ms: float = 0):
+    """
+    Builds a request handler that serves recorded FPL API payloads from `replay_dir`.
+
+    Requests are mapped onto the layout written by data_fetcher.record_replay_payloads,
+    e.g. /api/element-summary/1/ -> <replay_dir>/element-summary/1.json.
+    An optional artificial latency simulates the round trip to the live API.
+    """
+    class ReplayHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=replay_dir, **kwargs)
+
+        def translate_path(self, path):
+            path = path.split('?', 1)[0].strip('/')
+            if path.startswith('api/'):
+                path = path[len('api/'):]
+            return super().translate_path(f'/{path}.json')
+
+        def guess_type(self, path):
+            return 'application/json'
+
+        def do_GET(self):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            super().do_GET()
+
+        def log_message(self, format, *args):
+            logging.debug(format, *args)
+
+    return ReplayHandler
+
+def start_server(replay_dir: str, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0) -> ThreadingHTTPServer:
+    """
+    Starts a fake FPL API server in a background thread and returns it.
+
+    Pass port=0 to bind an ephemeral port; the API root is then
+    f"http://{host}:{server.server_port}/api/". Call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(os.path.abspath(replay_dir), latency_ms))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main():
+    """
+    Serves a directory of recorded FPL payloads as a stand-in for the FPL API.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('replay_dir', help="Directory written by data_fetcher.record_replay_payloads.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Artificial delay added to every response.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(os.path.abspath(args.replay_dir), args.latency_ms))
+    logging.info(f"Serving {args.replay_dir} as the FPL API at http://{args.host}:{args.port}/api/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
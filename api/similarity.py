@@ -0,0 +1,108 @@
+import threading
+import numpy as np
+import pandas as pd
+from . import database
+
+# Season totals from player_stats_fbref that are converted to per-90 features.
+FEATURE_COLUMNS = [
+    "Performance_Gls", "Performance_Ast", "Expected_xG", "Expected_npxG", "Expected_xAG",
+    "Progression_PrgC", "Progression_PrgP", "Progression_PrgR",
+]
+
+# Players with fewer full matches than this are too noisy to compare on a per-90 basis.
+MIN_90S = 3.0
+
+_cache = {'version': None, 'players': None, 'matrix': None}
+_cache_lock = threading.Lock()
+
+def build_feature_matrix():
+    """
+    Builds the normalised per-90 feature matrix for every player with enough minutes in the latest season.
+
+    Returns:
+        A tuple of (players, matrix): a DataFrame describing each row of the matrix
+        (player_id, full_name, position, team_name, price, nineties) and a dense float
+        matrix whose rows are unit vectors, so a dot product is the cosine similarity.
+    """
+    totals = ', '.join(f'SUM("{col}") AS "{col}"' for col in FEATURE_COLUMNS)
+    stats_query = f"""
+        SELECT player_id, SUM("Playing Time_90s") AS nineties, {totals}
+        FROM player_stats_fbref
+        WHERE season = (SELECT MAX(season) FROM player_stats_fbref)
+        GROUP BY player_id
+        HAVING SUM("Playing Time_90s") >= ?
+    """
+    # SQLite returns the bare `value` column from the row holding MAX(gameweek), i.e. the latest price.
+    players_query = """
+        SELECT p.player_id, p.full_name, p.position, t.team_name, h.value / 10.0 AS price
+        FROM players p
+        LEFT JOIN teams t ON t.team_id = p.team_id
+        LEFT JOIN (
+            SELECT player_id, value, MAX(gameweek) FROM player_gameweek_history GROUP BY player_id
+        ) h ON h.player_id = p.player_id
+    """
+    with database.get_db_connection() as conn:
+        stats_df = pd.read_sql_query(stats_query, conn, params=(MIN_90S,))
+        players_df = pd.read_sql_query(players_query, conn)
+
+    players = stats_df[['player_id', 'nineties']].merge(players_df, on='player_id', how='left')
+    players = players[['player_id', 'full_name', 'position', 'team_name', 'price', 'nineties']]
+
+    nineties = stats_df['nineties'].to_numpy(dtype=float)
+    features = stats_df[FEATURE_COLUMNS].fillna(0).to_numpy(dtype=float) / nineties[:, None]
+
+    # Standardise each feature so no single stat dominates, then scale rows to unit length.
+    std = features.std(axis=0)
+    features = (features - features.mean(axis=0)) / np.where(std > 0, std, 1.0)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    matrix = features / np.where(norms > 0, norms, 1.0)
+
+    return players, matrix
+
+def get_feature_matrix():
+    """
+    Returns the cached feature matrix, rebuilding it only when the data version has changed since it was built.
+    """
+    version = database.get_data_version()
+    with _cache_lock:
+        if _cache['version'] != version:
+            _cache['players'], _cache['matrix'] = build_feature_matrix()
+            _cache['version'] = version
+        return _cache['players'], _cache['matrix']
+
+def find_similar_players(player_id: int, k: int = 5, position: str = None, max_price: float = None):
+    """
+    Finds the players whose per-90 statistical profile is closest to the given player.
+
+    Args:
+        player_id: The ID of the player to find alternatives for.
+        k: The maximum number of players to return.
+        position: Only return players in this position (e.g. 'Midfielder').
+        max_price: Only return players whose latest price (in millions) is at most this.
+
+    Returns:
+        A DataFrame of up to k players ordered by descending 'similarity',
+        or None if the player has no feature vector (unknown or too few minutes).
+    """
+    players, matrix = get_feature_matrix()
+    matches = np.flatnonzero(players['player_id'].to_numpy() == player_id)
+    if matches.size == 0:
+        return None
+
+    scores = matrix @ matrix[matches[0]]
+
+    mask = players['player_id'].to_numpy() != player_id
+    if position:
+        mask &= (players['position'] == position).to_numpy()
+    if max_price is not None:
+        mask &= (players['price'] <= max_price).to_numpy()
+
+    candidates = np.flatnonzero(mask)
+    k = min(k, candidates.size)
+    if k == 0:
+        return players.iloc[[]].assign(similarity=pd.Series(dtype=float))
+
+    # argpartition selects the top k in linear time; only those k are then sorted.
+    top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    top = top[np.argsort(-scores[top])]
+    return players.iloc[top].assign(similarity=scores[top]).reset_index(drop=True)
@@ -4,7 +4,11 @@ import pandas as pd
 import phoenix as px
 # We will mock run_evals, so we don't need to import the real one.
 # from phoenix.evals import run_evals, HallucinationEvaluator, RelevanceEvaluator
-from api.analysis import get_llm_insight
+import os
+import tempfile
+from api import analysis
+from api.analysis import get_llm_insight, get_comparison_insight, PlayersNotFoundError, InsightGenerationError
+from api.database import create_database_tables, populate_teams_and_players, populate_gameweek_history
 
 class TestLLMEvaluation(unittest.TestCase):
 
@@ -92,5 +96,63 @@ class TestLLMEvaluation(unittest.TestCase):
         hallucination_result = eval_df.iloc[0]['hallucination_eval']['label']
         self.assertEqual(hallucination_result, "Not Hallucination")
 
+class TestComparisonInsight(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary database and a stub model."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        db_patcher = patch('api.database.DATABASE_FILE', os.path.join(tmp_dir.name, 'test_fpl.db'))
+        db_patcher.start()
+        self.addCleanup(db_patcher.stop)
+        cache_patcher = patch.object(analysis, '_comparison_cache', {'version': None, 'insights': {}})
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+        create_database_tables()
+        populate_teams_and_players(
+            [
+                {'id': 1, 'first_name': 'Bukayo', 'second_name': 'Saka', 'element_type': 3, 'team': 1},
+                {'id': 2, 'first_name': 'Cole', 'second_name': 'Palmer', 'element_type': 3, 'team': 2},
+            ],
+            [{'id': 1, 'name': 'Arsenal', 'code': 3}, {'id': 2, 'name': 'Chelsea', 'code': 8}],
+        )
+
+        self.stub_model = MagicMock()
+        self.stub_model.generate_content.return_value = MagicMock(text="Palmer edges Saka.")
+
+    def test_single_batched_call(self):
+        """Tests that all players are compared in one model call with a shared context."""
+        response = get_comparison_insight([2, 1], llm=self.stub_model)
+
+        self.assertEqual(response, "Palmer edges Saka.")
+        self.stub_model.generate_content.assert_called_once()
+        prompt = self.stub_model.generate_content.call_args[0][0]
+        self.assertIn("Bukayo Saka", prompt)
+        self.assertIn("Cole Palmer", prompt)
+
+    def test_cached_until_data_changes(self):
+        """Tests that the comparison is cached by the sorted id set and the data version."""
+        get_comparison_insight([1, 2], llm=self.stub_model)
+        get_comparison_insight([2, 1], llm=self.stub_model)
+        self.assertEqual(self.stub_model.generate_content.call_count, 1)
+
+        populate_gameweek_history([{'player_id': 1, 'round': 1, 'total_points': 12, 'value': 100}])
+        get_comparison_insight([1, 2], llm=self.stub_model)
+        self.assertEqual(self.stub_model.generate_content.call_count, 2)
+        self.assertIn("12", self.stub_model.generate_content.call_args[0][0])
+
+    def test_unknown_players_and_errors_not_cached(self):
+        """Tests that unknown players and model errors are reported without being cached."""
+        with self.assertRaises(PlayersNotFoundError) as raised:
+            get_comparison_insight([1, 99], llm=self.stub_model)
+        self.assertEqual(raised.exception.player_ids, [99])
+        self.stub_model.generate_content.assert_not_called()
+
+        self.stub_model.generate_content.side_effect = [RuntimeError("quota"), MagicMock(text="ok")]
+        with self.assertRaisesRegex(InsightGenerationError, "quota"):
+            get_comparison_insight([1, 2], llm=self.stub_model)
+        self.assertEqual(get_comparison_insight([1, 2], llm=self.stub_model), "ok")
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,8 @@
+import pandas as pd
 import pytest
 from unittest.mock import MagicMock
 from api.app import app
+from api.analysis import PlayersNotFoundError, InsightGenerationError
 
 @pytest.fixture
 def client():
@@ -117,3 +119,111 @@ def test_get_player_insight(client, mocker):
     assert player_name in kwargs['context']
     assert team_name in kwargs['context']
     assert str(mock_stats_data) in kwargs['context']
+
+
+def test_get_player_history(client, mocker):
+    """
+    Tests the /api/players/<player_id>/history endpoint.
+    """
+    # Given
+    mock_history = pd.DataFrame({'gameweek': [1, 2], 'total_points': [2, 6], 'form_points': [2.0, 4.0]})
+    mock_get_player_form = mocker.patch('api.app.get_player_form', return_value=mock_history)
+
+    # When
+    response = client.get('/api/players/1/history?window=3')
+
+    # Then
+    assert response.status_code == 200
+    assert response.json == mock_history.to_dict(orient='records')
+    mock_get_player_form.assert_called_once_with(1, window=3)
+    assert client.get('/api/players/1/history?window=0').status_code == 400
+
+
+def test_get_similar_players(client, mocker):
+    """
+    Tests the /api/players/<player_id>/similar endpoint.
+    """
+    # Given
+    mock_similar = pd.DataFrame({'player_id': [3], 'full_name': ['Leon Bailey'], 'price': [6.5], 'similarity': [0.97]})
+    mock_find = mocker.patch('api.app.find_similar_players', return_value=mock_similar)
+
+    # When
+    response = client.get('/api/players/1/similar?k=3&position=Midfielder&max_price=7.0')
+
+    # Then
+    assert response.status_code == 200
+    assert response.json == mock_similar.to_dict(orient='records')
+    mock_find.assert_called_once_with(1, k=3, position='Midfielder', max_price=7.0)
+
+    mock_find.return_value = None
+    assert client.get('/api/players/99/similar').status_code == 404
+
+
+def test_compare_players(client, mocker):
+    """
+    Tests the /api/players/compare endpoint.
+    """
+    # Given
+    mock_comparison = "Player 2 is the better pick."
+    mock_get_comparison = mocker.patch('api.app.get_comparison_insight', return_value=mock_comparison)
+
+    # When
+    response = client.get('/api/players/compare?ids=2,1,2')
+
+    # Then
+    assert response.status_code == 200
+    assert response.json == {"player_ids": [1, 2], "comparison": mock_comparison}
+    mock_get_comparison.assert_called_once_with([1, 2])
+
+    assert client.get('/api/players/compare?ids=1').status_code == 400
+    assert client.get('/api/players/compare?ids=1,abc').status_code == 400
+    assert client.get('/api/players/compare?ids=1,2,3,4,5,6').status_code == 400
+
+    # Unknown players are a 404 and model failures a 502, rather than an error message in a 200.
+    mock_get_comparison.side_effect = PlayersNotFoundError([99])
+    response = client.get('/api/players/compare?ids=1,99')
+    assert response.status_code == 404
+    assert response.json['missing_ids'] == [99]
+
+    mock_get_comparison.side_effect = InsightGenerationError("quota exceeded")
+    response = client.get('/api/players/compare?ids=1,2')
+    assert response.status_code == 502
+    assert "quota exceeded" in response.json['error']
+
+
+def test_get_player_stat_groups(client, mocker):
+    """
+    Tests the /api/stats/<player_id> endpoint when specific stat groups are requested.
+    """
+    # Given
+    mock_stats = pd.DataFrame({'season': ['2324'], 'Expected_xG': [12.3]})
+    mock_get_groups = mocker.patch('api.app.get_player_stat_groups', return_value=mock_stats)
+    mock_get_db_connection = mocker.patch('api.app.get_db_connection')
+
+    # When
+    response = client.get('/api/stats/1?groups=Expected,Performance')
+
+    # Then
+    assert response.status_code == 200
+    assert response.json == [{'season': '2324', 'Expected_xG': 12.3}]
+    mock_get_groups.assert_called_once_with(1, stat_groups=['Expected', 'Performance'], stat_type='standard')
+    mock_get_db_connection.assert_not_called()
+
+
+def test_get_stat_groups(client, mocker):
+    """
+    Tests the /api/stats/groups endpoint.
+    """
+    # Given
+    mock_catalog = pd.DataFrame(
+        [('standard', 'Performance', 'Gls'), ('standard', 'Performance', 'Ast'), ('shooting', 'Standard', 'Sh')],
+        columns=['stat_type', 'stat_group', 'stat']
+    )
+    mocker.patch('api.app.get_fbref_stat_catalog', return_value=mock_catalog)
+
+    # When
+    response = client.get('/api/stats/groups')
+
+    # Then
+    assert response.status_code == 200
+    assert response.json == {'standard': {'Performance': ['Gls', 'Ast']}, 'shooting': {'Standard': ['Sh']}}
@@ -1,7 +1,11 @@
+import json
 import pandas as pd
 import pytest
 from unittest.mock import AsyncMock, MagicMock
-from api.data_fetcher import get_fbref_stats, get_fpl_data
+from api.data_fetcher import (
+    LIVE_FPL_API_URL, get_fbref_stats, get_fpl_data, get_player_histories, set_fpl_api_url,
+)
+from api.replay_server import start_server
 
 
 def test_get_fpl_data(mocker):
@@ -48,3 +52,127 @@ def test_get_fbref_stats(mocker):
     assert not df.empty
     assert df.iloc[0]['player'] == 'Player 1'
     mock_fbref_class.assert_called_with(leagues="ENG-Premier League", seasons="2223")
+
+
+def test_get_player_histories(mocker):
+    """
+    Tests that get_player_histories only returns the last stored gameweek and newer ones.
+    """
+    # Given
+    summaries = {
+        1: {'history': [{'round': 1, 'total_points': 2}, {'round': 2, 'total_points': 6}]},
+        2: {'history': [{'round': 1, 'total_points': 1}, {'round': 2, 'total_points': 3}]},
+    }
+    mock_fpl_instance = MagicMock()
+    mock_fpl_instance.get_player_summary = AsyncMock(side_effect=lambda player_id, return_json: summaries[player_id])
+
+    mock_fpl_class = mocker.patch('api.data_fetcher.FPL')
+    mock_fpl_class.return_value = mock_fpl_instance
+
+    # When
+    history = get_player_histories([1, 2], latest_gameweeks={1: 2, 2: 1}, max_concurrency=1)
+
+    # Then
+    # The last stored gameweek is fetched again in case it was stored while still in progress.
+    assert history == [
+        {'round': 2, 'total_points': 6, 'player_id': 1},
+        {'round': 1, 'total_points': 1, 'player_id': 2},
+        {'round': 2, 'total_points': 3, 'player_id': 2},
+    ]
+    assert mock_fpl_instance.get_player_summary.await_count == 2
+
+
+def test_get_player_histories_partial_failure(mocker, caplog):
+    """
+    Tests that a failed element-summary request skips that player instead of losing every history.
+    """
+    # Given
+    async def get_player_summary(player_id, return_json):
+        if player_id == 2:
+            raise ConnectionError("connection reset")
+        return {'history': [{'round': 1, 'total_points': 2}]}
+
+    mock_fpl_instance = MagicMock()
+    mock_fpl_instance.get_player_summary = AsyncMock(side_effect=get_player_summary)
+
+    mock_fpl_class = mocker.patch('api.data_fetcher.FPL')
+    mock_fpl_class.return_value = mock_fpl_instance
+
+    requests = {}
+
+    # When
+    history = get_player_histories(
+        [1, 2, 3], on_request=lambda player_id, seconds, error: requests.__setitem__(player_id, error)
+    )
+
+    # Then
+    assert history == [
+        {'round': 1, 'total_points': 2, 'player_id': 1},
+        {'round': 1, 'total_points': 2, 'player_id': 3},
+    ]
+    assert "[2]" in caplog.text
+    # Every request is reported, including the failed one.
+    assert requests[1] is None and requests[3] is None
+    assert isinstance(requests[2], ConnectionError)
+
+
+@pytest.fixture
+def replay_dir(tmp_path, monkeypatch):
+    """
+    Writes a minimal set of recorded FPL payloads in the replay layout.
+    """
+    static = {
+        'elements': [{'id': 1, 'first_name': 'Bukayo', 'second_name': 'Saka', 'element_type': 3, 'team': 1}],
+        'teams': [{'id': 1, 'name': 'Arsenal', 'code': 3}],
+        'events': [{'id': 2, 'is_current': True}],
+    }
+    (tmp_path / 'bootstrap-static.json').write_text(json.dumps(static))
+    (tmp_path / 'element-summary').mkdir()
+    (tmp_path / 'element-summary' / '1.json').write_text(json.dumps(
+        {'history': [{'round': 1, 'total_points': 2}, {'round': 2, 'total_points': 6}]}
+    ))
+    yield tmp_path
+    set_fpl_api_url(LIVE_FPL_API_URL)
+
+
+def test_replay_from_files(replay_dir, monkeypatch):
+    """
+    Tests that recorded payloads are read from disk when REPLAY_DIR is set.
+    """
+    monkeypatch.setattr('api.data_fetcher.REPLAY_DIR', str(replay_dir))
+
+    players, teams = get_fpl_data()
+    history = get_player_histories([1], latest_gameweeks={1: 2})
+
+    assert players[0]['second_name'] == 'Saka'
+    assert teams[0]['name'] == 'Arsenal'
+    assert history == [{'round': 2, 'total_points': 6, 'player_id': 1}]
+
+
+def test_replay_legacy_fbref_recording(replay_dir, monkeypatch):
+    """
+    Tests that recordings holding only standard stats, under the old file name, can still be replayed.
+    """
+    monkeypatch.setattr('api.data_fetcher.REPLAY_DIR', str(replay_dir))
+    (replay_dir / 'fbref').mkdir()
+    pd.DataFrame({'player': ['Bukayo Saka'], 'goals': [16]}).to_pickle(replay_dir / 'fbref' / 'player_season_stats_2324.pkl')
+
+    assert get_fbref_stats(season="2324").iloc[0]['goals'] == 16
+    with pytest.raises(FileNotFoundError):
+        get_fbref_stats(season="2324", stat_type="shooting")
+
+
+def test_replay_server(replay_dir):
+    """
+    Tests fetching player histories over HTTP from the local replay server with the real FPL client.
+    """
+    server = start_server(str(replay_dir))
+    try:
+        set_fpl_api_url(f"http://127.0.0.1:{server.server_port}/api/")
+        history = get_player_histories([1])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [entry['round'] for entry in history] == [1, 2]
+    assert all(entry['player_id'] == 1 for entry in history)
@@ -1,7 +1,14 @@
+import functools
 import pytest
 import sqlite3
 import pandas as pd
-from api.database import create_database_tables, populate_teams_and_players, populate_fbref_stats, get_player_data
+from unittest.mock import MagicMock
+from api.database import (
+    create_database_tables, populate_teams_and_players, populate_fbref_stats, get_player_data,
+    get_latest_gameweeks, populate_gameweek_history, get_player_form, get_comparison_data,
+    get_schema_version, migrate_database, backfill_in_batches, MIGRATIONS,
+    get_player_stat_groups, get_fbref_stat_catalog,
+)
 
 # Mock data mimicking the FPL API structure (as dictionaries)
 mock_teams_data = [
@@ -147,3 +154,355 @@ def test_get_player_data(monkeypatch, tmp_path):
     assert player_data_no_stats.iloc[0]['full_name'] == 'Ollie Watkins'
     # Stats columns should be present but contain NaN or None
     assert pd.isna(player_data_no_stats.iloc[0]['Performance_Gls'])
+
+
+def test_populate_gameweek_history(monkeypatch, tmp_path):
+    """
+    Tests that gameweek history is appended incrementally, with double gameweeks combined.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    create_database_tables()
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    assert get_latest_gameweeks() == {}
+
+    # Gameweek 2 is a double gameweek for Bukayo Saka.
+    history_data = [
+        {'player_id': 1, 'round': 1, 'minutes': 90, 'total_points': 8, 'expected_goals': '0.50', 'value': 100},
+        {'player_id': 1, 'round': 2, 'minutes': 90, 'total_points': 2, 'expected_goals': '0.10', 'value': 100},
+        {'player_id': 1, 'round': 2, 'minutes': 60, 'total_points': 5, 'expected_goals': '0.30', 'value': 101},
+        {'player_id': 2, 'round': 1, 'minutes': 45, 'total_points': 1, 'expected_goals': '0.00', 'value': 90},
+    ]
+    populate_gameweek_history(history_data)
+    assert get_latest_gameweeks() == {1: 2, 2: 1}
+
+    conn = sqlite3.connect(test_db)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM player_gameweek_history WHERE player_id = 1 AND gameweek = 2")
+    double_gameweek = cursor.fetchone()
+    assert double_gameweek['fixtures'] == 2
+    assert double_gameweek['minutes'] == 150
+    assert double_gameweek['total_points'] == 7
+    assert double_gameweek['expected_goals'] == pytest.approx(0.4)
+    assert double_gameweek['value'] == 101
+
+    # Gameweeks without expected stats store NULL rather than 0.
+    cursor.execute("SELECT expected_assists FROM player_gameweek_history WHERE player_id = 2 AND gameweek = 1")
+    assert cursor.fetchone()[0] is None
+
+    conn.close()
+
+
+def test_populate_gameweek_history_mid_gameweek(monkeypatch, tmp_path):
+    """
+    Tests that a gameweek stored while still in progress is corrected by the next ingestion.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    create_database_tables()
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    populate_gameweek_history([
+        {'player_id': 1, 'round': 1, 'total_points': 8, 'bonus': 2},
+        {'player_id': 1, 'round': 2, 'total_points': 3, 'bonus': 0},
+    ])
+
+    # Once the double gameweek has finished, both fixtures (with confirmed bonus) are re-fetched.
+    full_history = [
+        {'player_id': 1, 'round': 1, 'total_points': 8, 'bonus': 2},
+        {'player_id': 1, 'round': 2, 'total_points': 6, 'bonus': 1},
+        {'player_id': 1, 'round': 2, 'total_points': 9, 'bonus': 2},
+    ]
+    latest_gameweeks = get_latest_gameweeks()
+    populate_gameweek_history([
+        entry for entry in full_history if entry['round'] >= latest_gameweeks[entry['player_id']]
+    ])
+
+    conn = sqlite3.connect(test_db)
+    rows = conn.execute(
+        "SELECT gameweek, fixtures, total_points, bonus FROM player_gameweek_history WHERE player_id = 1 ORDER BY gameweek"
+    ).fetchall()
+    assert rows == [(1, 1, 8, 2), (2, 2, 15, 3)]
+    conn.close()
+
+
+def test_get_player_form(monkeypatch, tmp_path):
+    """
+    Tests the rolling form metrics computed over the gameweek history.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    create_database_tables()
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    populate_gameweek_history([
+        {'player_id': 1, 'round': gameweek, 'minutes': 90, 'total_points': points}
+        for gameweek, points in enumerate([2, 4, 6, 8], start=1)
+    ])
+
+    form = get_player_form(player_id=1, window=2)
+
+    assert form['gameweek'].tolist() == [1, 2, 3, 4]
+    assert form['form_points'].tolist() == [2.0, 3.0, 5.0, 7.0]
+    assert get_player_form(player_id=2).empty
+
+
+def test_get_comparison_data(monkeypatch, tmp_path):
+    """
+    Tests the compact multi-player summary used for comparisons.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    create_database_tables()
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    populate_fbref_stats(pd.DataFrame({
+        'league': ['ENG-Premier League'], 'season': ['2023-2024'], 'team': ['Arsenal'], 'player': ['Bukayo Saka'],
+        'Playing Time_90s': [30.0], 'Performance_Gls': [10], 'Performance_Ast': [5],
+    }))
+    populate_gameweek_history([
+        {'player_id': 1, 'round': gameweek, 'total_points': points, 'value': 100 + gameweek}
+        for gameweek, points in enumerate([1, 2, 9, 10], start=1)
+    ])
+
+    comparison = get_comparison_data([2, 1], form_window=2)
+
+    assert comparison['player_id'].tolist() == [1, 2]
+    saka = comparison.iloc[0]
+    assert saka['team_name'] == 'Arsenal'
+    assert saka['price'] == 10.4
+    assert saka['form_points'] == 9.5
+    assert saka['goals'] == 10
+    assert pd.isna(comparison.iloc[1]['form_points'])
+
+
+def test_migrate_legacy_database(monkeypatch, tmp_path):
+    """
+    Tests that a database created before schema versioning is upgraded in place without losing data.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    # A legacy database has the original tables and data, but no schema_version table.
+    conn = sqlite3.connect(test_db)
+    conn.execute("CREATE TABLE teams (team_id INTEGER PRIMARY KEY, team_name TEXT UNIQUE NOT NULL, fpl_team_code INTEGER)")
+    conn.execute("INSERT INTO teams VALUES (1, 'Arsenal', 3)")
+    conn.commit()
+    conn.close()
+    assert get_schema_version() == 0
+
+    migrate_database(target_version=2)
+    assert get_schema_version() == 2
+
+    create_database_tables()
+    assert get_schema_version() == MIGRATIONS[-1][0]
+
+    conn = sqlite3.connect(test_db)
+    assert conn.execute("SELECT * FROM teams").fetchall() == [(1, 'Arsenal', 3)]
+    assert conn.execute("SELECT version FROM schema_version ORDER BY version").fetchall() == [
+        (version,) for version, _, _, _ in MIGRATIONS
+    ]
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    conn.close()
+
+    # Running the migrations again is a no-op.
+    create_database_tables()
+    assert get_schema_version() == MIGRATIONS[-1][0]
+
+
+def test_failed_migration_is_rolled_back(monkeypatch, tmp_path):
+    """
+    Tests that a failed migration leaves no partial changes behind, so the upgrade can be re-run.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+    create_database_tables()
+    latest_version = MIGRATIONS[-1][0]
+
+    def add_price_column(conn):
+        conn.execute("ALTER TABLE players ADD COLUMN price REAL")
+        if fail:
+            raise RuntimeError("backfill failed")
+
+    monkeypatch.setattr('api.database.MIGRATIONS', MIGRATIONS + [(latest_version + 1, "Player price", add_price_column, False)])
+
+    fail = True
+    with pytest.raises(RuntimeError):
+        migrate_database()
+    assert get_schema_version() == latest_version
+    conn = sqlite3.connect(test_db)
+    assert 'price' not in {info[1] for info in conn.execute("PRAGMA table_info(players)")}
+    conn.close()
+
+    fail = False
+    migrate_database()
+    assert get_schema_version() == latest_version + 1
+    conn = sqlite3.connect(test_db)
+    assert 'price' in {info[1] for info in conn.execute("PRAGMA table_info(players)")}
+    conn.close()
+
+
+def test_migrations_applied_concurrently_are_skipped(monkeypatch, tmp_path):
+    """
+    Tests that a migration recorded by another process after the schema version was read is not run again.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+    create_database_tables()
+
+    migrations = [(version, description, MagicMock(), batched) for version, description, _, batched in MIGRATIONS]
+    monkeypatch.setattr('api.database.MIGRATIONS', migrations)
+    # Simulate reading the schema version just before another process applied every migration.
+    monkeypatch.setattr('api.database.get_schema_version', lambda: 0)
+
+    migrate_database()
+
+    assert {batched for _, _, _, batched in migrations} == {False, True}
+    for _, _, migration, _ in migrations:
+        migration.assert_not_called()
+
+
+def test_backfill_in_batches(monkeypatch, tmp_path):
+    """
+    Tests that backfills process every row in batches, committing as they go.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    conn = sqlite3.connect(test_db)
+    conn.execute("CREATE TABLE source (value INTEGER)")
+    conn.execute("CREATE TABLE target (value INTEGER)")
+    conn.executemany("INSERT INTO source (value) VALUES (?)", [(i,) for i in range(25)])
+    conn.commit()
+
+    observer = sqlite3.connect(test_db)
+
+    total = backfill_in_batches(
+        conn,
+        "SELECT rowid, value FROM source WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        "INSERT INTO target (value) VALUES (?)",
+        transform=lambda rows: [(value * 2,) for _, value in rows],
+        batch_size=10,
+    )
+
+    assert total == 25
+    # The written rows are visible to another connection, so every batch was committed.
+    assert observer.execute("SELECT COUNT(*), SUM(value) FROM target").fetchone() == (25, 2 * sum(range(25)))
+    conn.close()
+    observer.close()
+
+
+def test_populate_fbref_stats_adaptive_columns(monkeypatch, tmp_path):
+    """
+    Tests that fbref stats missing from the wide table are kept in the key/value store.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    create_database_tables()
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    index = pd.MultiIndex.from_tuples(
+        [('ENG-Premier League', '2324', 'Arsenal', 'Bukayo Saka')], names=['league', 'season', 'team', 'player']
+    )
+    standard = pd.DataFrame(
+        [[10, 5, 2.5]], index=index,
+        columns=pd.MultiIndex.from_tuples([('Performance', 'Gls'), ('Performance', 'Ast'), ('Aerial Duels', 'Won%')])
+    )
+    shooting = pd.DataFrame(
+        [[80, 30]], index=index, columns=pd.MultiIndex.from_tuples([('Standard', 'Sh'), ('Standard', 'SoT')])
+    )
+
+    populate_fbref_stats(standard)
+    populate_fbref_stats(shooting, stat_type='shooting')
+
+    # The new 'Aerial Duels' group is stored, and the shooting stats did not clobber the wide table.
+    catalog = get_fbref_stat_catalog()
+    assert ('standard', 'Aerial Duels', 'Won%') in set(catalog.itertuples(index=False, name=None))
+    assert ('shooting', 'Standard', 'SoT') in set(catalog.itertuples(index=False, name=None))
+
+    stats = get_player_stat_groups(player_id=1, stat_groups=['Aerial Duels'])
+    assert stats.columns.tolist() == ['league', 'season', 'team', 'Aerial Duels_Won%']
+    assert stats.iloc[0]['Aerial Duels_Won%'] == 2.5
+
+    shooting_stats = get_player_stat_groups(player_id=1, stat_type='shooting')
+    assert shooting_stats.iloc[0]['Standard_Sh'] == 80
+    assert get_player_stat_groups(player_id=2).empty
+
+    conn = sqlite3.connect(test_db)
+    conn.row_factory = sqlite3.Row
+    assert conn.execute("SELECT \"Performance_Gls\" FROM player_stats_fbref WHERE player_id = 1").fetchone()[0] == 10
+    pivot = conn.execute("SELECT * FROM player_stats_fbref_pivot WHERE player_id = 1").fetchone()
+    assert pivot['Aerial Duels_Won%'] == 2.5
+    assert pivot['shooting_Standard_SoT'] == 30
+    conn.close()
+
+
+def test_populate_fbref_stats_ungrouped_columns(monkeypatch, tmp_path, caplog):
+    """
+    Tests that single-level fbref columns are stored in their own stat group, metadata is
+    excluded and non-numeric columns are skipped with a warning.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+
+    create_database_tables()
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    passing = pd.DataFrame(
+        [['ENG', 21, 28.4, 412, 67, 'Matches']],
+        index=pd.MultiIndex.from_tuples(
+            [('ENG-Premier League', '2324', 'Arsenal', 'Bukayo Saka')], names=['league', 'season', 'team', 'player']
+        ),
+        columns=pd.MultiIndex.from_tuples(
+            [('nation', ''), ('age', ''), ('90s', ''), ('Total', 'Cmp'), ('KP', ''), ('Matches', '')]
+        )
+    )
+
+    with caplog.at_level('WARNING'):
+        populate_fbref_stats(passing, stat_type='passing')
+
+    stats = get_player_stat_groups(player_id=1, stat_type='passing')
+    assert stats.iloc[0]['KP'] == 67
+    assert stats.iloc[0]['90s'] == 28.4
+    assert stats.iloc[0]['Total_Cmp'] == 412
+    assert 'age' not in stats.columns
+    assert 'Matches' in caplog.text
+
+    ungrouped = get_player_stat_groups(player_id=1, stat_groups=['Ungrouped'], stat_type='passing')
+    assert ungrouped.iloc[0]['KP'] == 67
+    assert 'Total_Cmp' not in ungrouped.columns
+
+    catalog = set(get_fbref_stat_catalog().itertuples(index=False, name=None))
+    assert ('passing', 'Ungrouped', 'KP') in catalog
+    assert not any(stat in ('nation', 'age', 'Matches') for _, _, stat in catalog)
+
+    conn = sqlite3.connect(test_db)
+    conn.row_factory = sqlite3.Row
+    assert conn.execute("SELECT * FROM player_stats_fbref_pivot WHERE player_id = 1").fetchone()['passing_KP'] == 67
+    conn.close()
+
+
+def test_migrate_backfills_fbref_stat_store(monkeypatch, tmp_path):
+    """
+    Tests that upgrading a database with existing wide fbref rows backfills the key/value store.
+    """
+    test_db = tmp_path / "test_fpl.db"
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(test_db))
+    # Backfill one row per batch so the migration has to resume across several batches.
+    monkeypatch.setattr('api.database.backfill_in_batches', functools.partial(backfill_in_batches, batch_size=1))
+
+    migrate_database(target_version=4)
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    conn = sqlite3.connect(test_db)
+    conn.executemany(
+        'INSERT INTO player_stats_fbref (player_id, league, season, team, "Performance_Gls") VALUES (?, ?, ?, ?, ?)',
+        [(1, 'ENG-Premier League', '2324', 'Arsenal', 10), (2, 'ENG-Premier League', '2324', 'Aston Villa', 19)]
+    )
+    conn.commit()
+    conn.close()
+
+    create_database_tables()
+
+    assert get_player_stat_groups(player_id=2, stat_groups=['Performance']).iloc[0]['Performance_Gls'] == 19
+    assert len(get_fbref_stat_catalog()) > 0
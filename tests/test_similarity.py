@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+from api import similarity
+from api.database import create_database_tables, populate_teams_and_players, populate_fbref_stats, populate_gameweek_history
+from api.similarity import find_similar_players, get_feature_matrix
+
+mock_teams_data = [
+    {'id': 1, 'name': 'Arsenal', 'code': 3},
+    {'id': 2, 'name': 'Aston Villa', 'code': 7},
+]
+
+mock_players_data = [
+    {'id': 1, 'first_name': 'Bukayo', 'second_name': 'Saka', 'element_type': 3, 'team': 1},
+    {'id': 2, 'first_name': 'Ollie', 'second_name': 'Watkins', 'element_type': 4, 'team': 2},
+    {'id': 3, 'first_name': 'Leon', 'second_name': 'Bailey', 'element_type': 3, 'team': 2},
+    {'id': 4, 'first_name': 'Gabriel', 'second_name': 'Magalhães', 'element_type': 2, 'team': 1},
+    {'id': 5, 'first_name': 'Reserve', 'second_name': 'Player', 'element_type': 3, 'team': 1},
+]
+
+def make_stats(player, team, nineties, gls, ast, xg, xag, prgc):
+    return {
+        'league': 'ENG-Premier League', 'season': '2324', 'team': team, 'player': player,
+        'Playing Time_90s': nineties, 'Performance_Gls': gls, 'Performance_Ast': ast,
+        'Expected_xG': xg, 'Expected_npxG': xg, 'Expected_xAG': xag,
+        'Progression_PrgC': prgc, 'Progression_PrgP': prgc, 'Progression_PrgR': prgc,
+    }
+
+@pytest.fixture
+def populated_db(monkeypatch, tmp_path):
+    """
+    Creates a temporary database with players, prices and fbref stats.
+    """
+    monkeypatch.setattr('api.database.DATABASE_FILE', str(tmp_path / "test_fpl.db"))
+    monkeypatch.setattr(similarity, '_cache', {'version': None, 'players': None, 'matrix': None})
+
+    create_database_tables()
+    populate_teams_and_players(mock_players_data, mock_teams_data)
+    populate_fbref_stats(pd.DataFrame([
+        make_stats('Bukayo Saka', 'Arsenal', 30, 15, 10, 14, 11, 150),
+        make_stats('Leon Bailey', 'Aston Villa', 20, 9, 6, 8, 7, 90),
+        make_stats('Ollie Watkins', 'Aston Villa', 35, 19, 13, 20, 8, 30),
+        make_stats('Gabriel Magalhães', 'Arsenal', 34, 4, 0, 3, 1, 5),
+        make_stats('Reserve Player', 'Arsenal', 1, 1, 0, 1, 0, 10),
+    ]))
+    populate_gameweek_history([
+        {'player_id': 1, 'round': 1, 'value': 100},
+        {'player_id': 2, 'round': 1, 'value': 90},
+        {'player_id': 3, 'round': 1, 'value': 65},
+        {'player_id': 4, 'round': 1, 'value': 60},
+    ])
+
+def test_find_similar_players(populated_db):
+    """
+    Tests that the nearest neighbours are ranked by cosine similarity of per-90 stats.
+    """
+    similar = find_similar_players(player_id=1, k=3)
+
+    assert similar['player_id'].tolist()[0] == 3  # Bailey has the closest per-90 profile to Saka
+    assert similar['similarity'].is_monotonic_decreasing
+    assert 1 not in similar['player_id'].tolist()
+    assert 5 not in similar['player_id'].tolist()  # Below the minimum minutes threshold
+    assert similar.iloc[0]['price'] == 6.5
+
+def test_find_similar_players_filters(populated_db):
+    """
+    Tests the position and price filters, and unknown players.
+    """
+    assert find_similar_players(player_id=1, position='Forward')['player_id'].tolist() == [2]
+    assert find_similar_players(player_id=2, max_price=6.0)['player_id'].tolist() == [4]
+    assert find_similar_players(player_id=2, max_price=1.0).empty
+    assert find_similar_players(player_id=5) is None
+
+def test_feature_matrix_cache(populated_db):
+    """
+    Tests that the feature matrix is cached until the next ingestion.
+    """
+    players, matrix = get_feature_matrix()
+    assert get_feature_matrix()[1] is matrix
+    assert matrix.shape == (len(players), len(similarity.FEATURE_COLUMNS))
+
+    populate_gameweek_history([{'player_id': 1, 'round': 2, 'value': 95}])
+
+    players, rebuilt = get_feature_matrix()
+    assert rebuilt is not matrix
+    assert players.loc[players['player_id'] == 1, 'price'].iloc[0] == 9.5